@@ -0,0 +1,52 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+# _scorer
+# C keyword scan and LXXLL search used by classifier.NRCofactorClassifier when built:
+#     cythonize -i _scorer.pyx
+from cpython.mem cimport PyMem_Malloc, PyMem_Free
+from libc.string cimport strstr
+
+
+cdef class ScorerCore:
+    # keyword table as C strings; self.keywords keeps the bytes objects alive
+    cdef char** table
+    cdef Py_ssize_t size
+    cdef readonly tuple keywords
+
+    def __cinit__(self, keywords):
+        self.keywords = tuple(k.encode('utf-8') if isinstance(k, str) else bytes(k) for k in keywords)
+        self.size = len(self.keywords)
+        self.table = <char**> PyMem_Malloc(max(self.size, 1) * sizeof(char*))
+        if self.table == NULL:
+            raise MemoryError()
+        cdef Py_ssize_t k
+        for k in range(self.size):
+            self.table[k] = self.keywords[k]
+
+    def __dealloc__(self):
+        PyMem_Free(self.table)
+
+    def __reduce__(self):
+        # rebuilt from the keywords, so classifiers can go to worker processes
+        return ScorerCore, (self.keywords,)
+
+    def match(self, bytes desc):
+        # indices of all keywords occurring in desc, in table order
+        cdef const char* text = desc
+        cdef Py_ssize_t k
+        cdef list hits = []
+        for k in range(self.size):
+            if strstr(text, self.table[k]) != NULL:
+                hits.append(k)
+        return hits
+
+
+def has_lxxll(bytes seq):
+    # same as re.search('L..LL', ...) on ascii residues: '.' excludes newlines
+    cdef const unsigned char* s = seq
+    cdef Py_ssize_t n = len(seq)
+    cdef Py_ssize_t k
+    for k in range(n - 4):
+        if (s[k] == b'L' and s[k + 3] == b'L' and s[k + 4] == b'L'
+                and s[k + 1] != b'\n' and s[k + 2] != b'\n'):
+            return True
+    return False
@@ -1,12 +1,134 @@
 # classifier
 import json
+import math
 import os
 import re  
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from types import MappingProxyType
 from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 
-@dataclass
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib json parser
+    orjson = None
+
+try:
+    import ahocorasick
+except ImportError:  # fall back to one substring test per keyword
+    ahocorasick = None
+
+try:
+    import ijson
+except ImportError:  # large files are parsed whole like any other
+    ijson = None
+
+try:
+    import numpy as np
+except ImportError:  # LXXLL search stays on the regex path
+    np = None
+
+try:
+    from numba import njit
+except ImportError:  # pair search runs as plain Python
+    njit = None
+
+try:
+    import _scorer
+except ImportError:  # extension not built (cythonize -i _scorer.pyx)
+    _scorer = None
+
+# shared read-only default for missing JSON blocks
+_EMPTY = MappingProxyType({})
+
+# batches with fewer distinct ids than this are classified in the calling
+# process; below it, starting a worker pool costs more than it saves
+PARALLEL_MIN_BATCH = 32
+
+# files at least this large are stream-parsed with ijson when it is available
+STREAMING_MIN_BYTES = 8 * 1024 * 1024
+
+# keyword categories
+NR = 'nr'
+COACTIVATOR = 'coactivator'
+COREPRESSOR = 'corepressor'
+
+# LXXLL coactivator-binding motif
+_LXXLL_RE = re.compile(r'L..LL')
+
+# sequences longer than this are searched with numpy instead of the regex;
+# below it the fixed cost of building the arrays outweighs the regex scan
+_LXXLL_NUMPY_MIN_LENGTH = 10000
+
+# distinct descriptions remembered by the keyword cache before it is cleared
+KEYWORD_CACHE_SIZE = 4096
+
+
+def _has_lxxll(sequence: str) -> bool:
+    # C scan when the _scorer extension is built, otherwise a vectorised test
+    # over the residue bytes for long ascii sequences; the wildcard positions
+    # exclude newlines to match the regex '.'
+    if not sequence.isascii():
+        return _LXXLL_RE.search(sequence) is not None
+    if _scorer is not None:
+        return _scorer.has_lxxll(sequence.encode('ascii'))
+    if np is None or len(sequence) <= _LXXLL_NUMPY_MIN_LENGTH:
+        return _LXXLL_RE.search(sequence) is not None
+
+    s = np.frombuffer(sequence.encode('ascii'), dtype=np.uint8)
+    L, NEWLINE = ord('L'), ord('\n')
+    return bool((
+        (s[:-4] == L) & (s[1:-3] != NEWLINE) & (s[2:-2] != NEWLINE) & (s[3:-1] == L) & (s[4:] == L)
+    ).any())
+
+
+def _best_pair_indices(receptor_scores, cofactor_scores) -> Tuple[int, int, float]:
+    # best (receptor, cofactor) pair of distinct chains by mean score, as
+    # (receptor index, cofactor index, confidence); (-1, -1, 0.0) when no pair
+    # beats zero. each unordered pair is visited once in both orientations and
+    # on equal confidence the earliest (receptor, cofactor) index pair wins
+    n = len(receptor_scores)
+
+    # suffix maxima bound every pair (i, j > i) a row can still produce
+    max_receptor_after = [-math.inf] * (n + 1)
+    max_cofactor_after = [-math.inf] * (n + 1)
+    for k in range(n - 1, -1, -1):
+        max_receptor_after[k] = max(max_receptor_after[k + 1], receptor_scores[k])
+        max_cofactor_after[k] = max(max_cofactor_after[k + 1], cofactor_scores[k])
+
+    best_r, best_c, best_confidence = -1, -1, 0.0
+    for i in range(n):
+        # skip rows whose bound cannot beat the best pair so far
+        upper = max(
+            receptor_scores[i] + max_cofactor_after[i + 1],
+            max_receptor_after[i + 1] + cofactor_scores[i],
+        ) / 2.0
+        if upper < best_confidence:
+            continue
+
+        for j in range(i + 1, n):
+            confidence_ij = (receptor_scores[i] + cofactor_scores[j]) / 2.0
+            confidence_ji = (receptor_scores[j] + cofactor_scores[i]) / 2.0
+            if confidence_ji > confidence_ij:
+                r, c, confidence = j, i, confidence_ji
+            else:
+                r, c, confidence = i, j, confidence_ij
+
+            if confidence > best_confidence or (
+                confidence == best_confidence and best_r >= 0 and (r < best_r or (r == best_r and c < best_c))
+            ):
+                best_r, best_c, best_confidence = r, c, confidence
+
+    return best_r, best_c, best_confidence
+
+
+if njit is not None:
+    _best_pair_indices = njit(cache=True)(_best_pair_indices)
+
+@dataclass(slots=True)
 class ChainInfo:
+    # description and entity_type are stored lowercased
     chain_id: str
     description: str
     entity_type: str
@@ -70,88 +192,184 @@ class NRCofactorClassifier:
 
         # self.corepressor_sequence = 'LXXLL' 
 
+        # longest (most specific) keywords first, so their reasons are listed first
+        self.nr_keywords.sort(key=len, reverse=True)
+        self.coactivator_keywords.sort(key=len, reverse=True)
+        self.corepressor_keywords.sort(key=len, reverse=True)
+
+        # keyword table indexed by keyword id: (category, weight, keyword, reason),
+        # with the reason message formatted once here rather than on every hit
+        self._keywords = []
+        for keyword in self.nr_keywords:
+            if keyword in ['nuclear receptor', 'steroid receptor']:
+                self._keywords.append((NR, 1.0, keyword, f"Generic NR term: {keyword}"))
+            else:
+                self._keywords.append((NR, 0.8, keyword, f"Specific NR: {keyword}"))
+        for keyword in self.coactivator_keywords:
+            self._keywords.append((COACTIVATOR, 0.8, keyword, f"Coactivator keyword: {keyword}"))
+        for keyword in self.corepressor_keywords:
+            self._keywords.append((COREPRESSOR, 0.8, keyword, f"Corepressor keyword: {keyword}"))
+
+        # distinct keywords with the ids they stand for (a keyword may be listed twice)
+        ids_by_keyword = {}
+        for kid, (_, _, keyword, _) in enumerate(self._keywords):
+            ids_by_keyword.setdefault(keyword, []).append(kid)
+        self._keyword_ids = [(keyword, tuple(ids)) for keyword, ids in ids_by_keyword.items()]
+
+        # C keyword table from the _scorer extension when built; otherwise one
+        # automaton over all keywords, scanning a description in a single pass
+        self._scorer = None
+        self.automaton = None
+        if _scorer is not None:
+            self._scorer = _scorer.ScorerCore([keyword for keyword, _ in self._keyword_ids])
+        elif ahocorasick is not None:
+            self.automaton = ahocorasick.Automaton()
+            for keyword, ids in self._keyword_ids:
+                self.automaton.add_word(keyword, ids)
+            self.automaton.make_automaton()
+
+        # description -> keyword ids, filled by _match_keywords
+        self._keyword_hits: Dict[str, Tuple[int, ...]] = {}
+
+    def __getstate__(self):
+        # the keyword cache is per process; leave it out of what is sent to workers
+        state = self.__dict__.copy()
+        state['_keyword_hits'] = {}
+        return state
+
     def load_pdb_data(self, pdb_id: str, data_dir: str = "data") -> Optional[Dict]:
         # json files reading
         file_path = os.path.join(data_dir, f"{pdb_id}.json")
-        if not os.path.exists(file_path):
+        try:
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
             print(f"Warning: Data file not found for {pdb_id}")
             return None
         
-        with open(file_path, 'r') as f:
-            return json.load(f)
+        return self._parse_json(raw)
+
+    def _parse_json(self, raw: bytes) -> Dict:
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw)
     
     def extract_chain_info(self, data: Dict) -> List[ChainInfo]:
         chains = []
         
-        if not data.get('entry') or not data['entry'].get('polymer_entities'):
+        entities = (data.get('entry') or _EMPTY).get('polymer_entities')
+        if not entities:
             return chains
         
-        for entity in data['entry']['polymer_entities']:
-            # chain IDs
-            chain_ids = entity.get('rcsb_polymer_entity_container_identifiers', {}).get('auth_asym_ids', [])
-            if not chain_ids:
-                continue
-            
-            # description
-            description = entity.get('rcsb_polymer_entity', {}).get('pdbx_description', '').lower()
-            
-            # entity type
-            entity_type = entity.get('entity_poly', {}).get('type', '').lower()
-            
-            # sequence
-            entity_sequence = entity.get('entity_poly', {}).get('pdbx_seq_one_letter_code_can', '')
-            
-            for chain_id in chain_ids:
-                chains.append(ChainInfo(
-                    chain_id=chain_id,
-                    description=description,
-                    entity_type=entity_type,
-                    entity_sequence=entity_sequence,
-                ))
+        for entity in entities:
+            chains.extend(self._entity_chains(entity))
         
         return chains
+
+    def extract_chain_info_streaming(self, file_path: str) -> List[ChainInfo]:
+        # same as extract_chain_info(load_pdb_data(...)), but builds chains from
+        # each polymer entity as ijson yields it instead of loading the document
+        if ijson is None:
+            raise ImportError("extract_chain_info_streaming requires the ijson package")
+        with open(file_path, 'rb') as f:
+            return self._stream_chains(f)
+
+    def _stream_chains(self, f) -> List[ChainInfo]:
+        chains = []
+        for entity in ijson.items(f, 'entry.polymer_entities.item'):
+            chains.extend(self._entity_chains(entity))
+        return chains
+
+    def _entity_chains(self, entity: Dict) -> List[ChainInfo]:
+        # one ChainInfo per chain ID of a polymer entity
+        chain_ids = (entity.get('rcsb_polymer_entity_container_identifiers') or _EMPTY).get('auth_asym_ids')
+        if not chain_ids:
+            return []
+        
+        # description
+        description = ((entity.get('rcsb_polymer_entity') or _EMPTY).get('pdbx_description') or '').lower()
+        
+        # entity type and sequence
+        poly = entity.get('entity_poly') or _EMPTY
+        entity_type = (poly.get('type') or '').lower()
+        entity_sequence = poly.get('pdbx_seq_one_letter_code_can') or ''
+        
+        return [
+            ChainInfo(
+                chain_id=chain_id,
+                description=description,
+                entity_type=entity_type,
+                entity_sequence=entity_sequence,
+            )
+            for chain_id in chain_ids
+        ]
     
+    def _match_keywords(self, text: str) -> Tuple[int, ...]:
+        # ids of all keywords occurring in text, in keyword table order.
+        # descriptions repeat across entries (and most hit nothing), so a
+        # description seen before is answered with one dict lookup (the cache
+        # holds at most KEYWORD_CACHE_SIZE descriptions)
+        if not text:
+            return ()
+        hits = self._keyword_hits.get(text)
+        if hits is None:
+            if len(self._keyword_hits) >= KEYWORD_CACHE_SIZE:
+                self._keyword_hits.clear()
+            hits = self._keyword_hits[text] = tuple(self._scan_keywords(text))
+        return hits
+
+    def _scan_keywords(self, text: str) -> List[int]:
+        # each keyword id is counted once however often (or overlapped) it occurs
+        hits = set()
+        if self._scorer is not None:
+            # keywords are ascii, so matching on the utf-8 bytes is exact
+            for k in self._scorer.match(text.encode('utf-8')):
+                hits.update(self._keyword_ids[k][1])
+        elif self.automaton is None:
+            # str.__contains__ per distinct keyword; measured faster than a single
+            # alternation regex, which sre tries branch by branch at every position
+            for keyword, ids in self._keyword_ids:
+                if keyword in text:
+                    hits.update(ids)
+        else:
+            for _, ids in self.automaton.iter(text):
+                hits.update(ids)
+        return sorted(hits)
+
     def score_nuclear_receptor(self, description: str) -> Tuple[float, List[str]]:
-        # how likely the chain is nuclear receptor
+        # how likely the chain is nuclear receptor; expects a lowercased description
         score = 0.0
         reasons = []
         
-        desc_lower = description.lower()
-        
-        for keyword in self.nr_keywords:
-            if keyword in desc_lower:
-                if keyword in ['nuclear receptor', 'steroid receptor']:
-                    score += 1.0
-                    reasons.append(f"Generic NR term: {keyword}")
-                else:
-                    score += 0.8
-                    reasons.append(f"Specific NR: {keyword}")
+        for kid in self._match_keywords(description):
+            category, weight, _, reason = self._keywords[kid]
+            if category != NR:
+                continue
+            score += weight
+            reasons.append(reason)
         
         return min(score, 1.0), reasons
     
     def score_cofactor(self, description: str, sequence: str) -> Tuple[float, str, List[str]]:
         # scores how likely a chain is a cofactor based on its description AND sequence.
+        # the description is expected lowercased, as in ChainInfo
         coactivator_score = 0.0
         corepressor_score = 0.0
         reasons = []
         
-        desc_lower = description.lower()
-        
-        # coactivator keywords
-        for keyword in self.coactivator_keywords:
-            if keyword in desc_lower:
-                coactivator_score += 0.8
-                reasons.append(f"Coactivator keyword: {keyword}")
-        
-        # corepressor keywords
-        for keyword in self.corepressor_keywords:
-            if keyword in desc_lower:
-                corepressor_score += 0.8
-                reasons.append(f"Corepressor keyword: {keyword}")
+        # coactivator and corepressor keywords, in one pass over the description
+        for kid in self._match_keywords(description):
+            category, weight, _, reason = self._keywords[kid]
+            if category == COACTIVATOR:
+                coactivator_score += weight
+                reasons.append(reason)
+            elif category == COREPRESSOR:
+                corepressor_score += weight
+                reasons.append(reason)
 
         
         # search for LXXLL motif in the amino acid sequene
-        if sequence and re.search('L..LL', sequence):
+        if sequence and _has_lxxll(sequence):
             # add a significant score for this strong evidence
             # cannot be small since it is very indicating factor for considering NaR cofactor binding
             coactivator_score += 0.5  
@@ -165,12 +383,30 @@ class NRCofactorClassifier:
         else:
             return 0.0, "unknown", reasons
     
+    def load_chains(self, pdb_id: str, data_dir: str = "data") -> Optional[List[ChainInfo]]:
+        # chains of a PDB entry, or None when its data is not available;
+        # large files are streamed so the whole document is never materialized.
+        # the size comes from the open file, so each entry costs a single open
+        file_path = os.path.join(data_dir, f"{pdb_id}.json")
+        try:
+            with open(file_path, 'rb') as f:
+                if ijson is not None and os.fstat(f.fileno()).st_size >= STREAMING_MIN_BYTES:
+                    return self._stream_chains(f)
+                raw = f.read()
+        except FileNotFoundError:
+            print(f"Warning: Data file not found for {pdb_id}")
+            return None
+
+        data = self._parse_json(raw)
+        if not data:
+            return None
+        return self.extract_chain_info(data)
+    
     def classify_complex(self, pdb_id: str, data_dir: str = "data") -> ClassificationResult:
-            data = self.load_pdb_data(pdb_id, data_dir)
-            if not data:
+            chains = self.load_chains(pdb_id, data_dir)
+            if chains is None:
                 return ClassificationResult(pdb_id=pdb_id, is_nr_cofactor_complex=False, confidence_score=0.0, reasons=["Data not available"], receptor_chain=None, cofactor_chain=None, receptor_type=None, cofactor_type=None)
 
-            chains = self.extract_chain_info(data)
             if len(chains) < 2:
                 return ClassificationResult(pdb_id=pdb_id, is_nr_cofactor_complex=False, confidence_score=0.0, reasons=["Insufficient number of chains"], receptor_chain=None, cofactor_chain=None, receptor_type=None, cofactor_type=None)
 
@@ -184,36 +420,37 @@ class NRCofactorClassifier:
                 "cofactor_reasons": []
             }
             
-            for i in range(len(chains)):
-                for j in range(len(chains)):
-                    if i == j:
-                        continue
-
-                    receptor_candidate = chains[i]
-                    cofactor_candidate = chains[j]
-                    
-                    nr_score, nr_reasons = self.score_nuclear_receptor(receptor_candidate.description)
-                    
-                    # pass the sequence to the scoring function
-                    cofactor_score, cofactor_type, cofactor_reasons = self.score_cofactor(
-                        cofactor_candidate.description, 
-                        cofactor_candidate.entity_sequence
+            # score every chain once; the pair loop below only combines these.
+            # chains of one entity (homodimers, tetramers) share description and
+            # sequence, so each distinct entity is scored a single time
+            entity_scores = {}
+            nr, cf = [], []
+            for c in chains:
+                key = (c.description, c.entity_sequence)
+                if key not in entity_scores:
+                    entity_scores[key] = (
+                        self.score_nuclear_receptor(c.description),
+                        self.score_cofactor(c.description, c.entity_sequence),
                     )
-                    
-                    penalty_score, _, _ = self.score_cofactor(receptor_candidate.description, receptor_candidate.entity_sequence)
-                    nr_score -= penalty_score * 0.5 
-
-                    confidence = (nr_score + cofactor_score) / 2.0
-
-                    if confidence > best_pair["confidence"]:
-                        best_pair["receptor"] = receptor_candidate
-                        best_pair["cofactor"] = cofactor_candidate
-                        best_pair["nr_score"] = nr_score
-                        best_pair["cofactor_score"] = cofactor_score
-                        best_pair["confidence"] = confidence
-                        best_pair["nr_reasons"] = nr_reasons
-                        best_pair["cofactor_reasons"] = cofactor_reasons
-                        best_pair["cofactor_type"] = cofactor_type
+                nr_entry, cf_entry = entity_scores[key]
+                nr.append(nr_entry)
+                cf.append(cf_entry)
+
+            # receptor score of each chain, penalised by how cofactor-like it is
+            receptor_scores = [nr[k][0] - cf[k][0] * 0.5 for k in range(len(chains))]
+            cofactor_scores = [entry[0] for entry in cf]
+            if njit is not None:
+                receptor_scores = np.asarray(receptor_scores, dtype=np.float64)
+                cofactor_scores = np.asarray(cofactor_scores, dtype=np.float64)
+
+            r, c, confidence = _best_pair_indices(receptor_scores, cofactor_scores)
+            if r >= 0:
+                best_pair["confidence"] = confidence
+                best_pair["receptor"] = chains[r]
+                best_pair["cofactor"] = chains[c]
+                best_pair["nr_score"] = float(receptor_scores[r])
+                best_pair["nr_reasons"] = nr[r][1]
+                best_pair["cofactor_score"], best_pair["cofactor_type"], best_pair["cofactor_reasons"] = cf[c]
 
             is_complex = best_pair["nr_score"] >= 0.5 and best_pair["cofactor_score"] >= 0.3
             
@@ -237,12 +474,33 @@ class NRCofactorClassifier:
                 reasons=all_reasons
             )
     
-    def batch_classify(self, pdb_ids: List[str], data_dir: str = "data") -> List[ClassificationResult]:
-        results = []
+    def batch_classify(self, pdb_ids: List[str], data_dir: str = "data", max_workers: Optional[int] = None) -> List[ClassificationResult]:
+        # ids repeat when lists are merged, so each distinct id is classified once
+        unique_ids = list(dict.fromkeys(pdb_ids))
+
+        # entries are independent, so classify them across worker processes;
+        # a single effective worker or a small batch stays in the calling process
+        workers = max_workers or os.cpu_count() or 1
+        if workers == 1 or len(unique_ids) < PARALLEL_MIN_BATCH:
+            results = [self.classify_complex(pdb_id, data_dir) for pdb_id in unique_ids]
+        else:
+            # hand out ids in chunks so large batches are not dominated by IPC
+            chunksize = max(1, len(unique_ids) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(partial(self.classify_complex, data_dir=data_dir), unique_ids, chunksize=chunksize))
+
+        # every occurrence gets its own result object; repeats are copies
+        results_by_id = dict(zip(unique_ids, results))
+        seen = set()
+        batch = []
         for pdb_id in pdb_ids:
-            result = self.classify_complex(pdb_id, data_dir)
-            results.append(result)
-        return results
+            result = results_by_id[pdb_id]
+            if pdb_id in seen:
+                result = replace(result, reasons=list(result.reasons))
+            else:
+                seen.add(pdb_id)
+            batch.append(result)
+        return batch
 
 # Example usage and testing
 # def main():